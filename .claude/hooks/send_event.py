@@ -3,6 +3,8 @@
 # requires-python = ">=3.8"
 # dependencies = [
 #     "python-dotenv",
+#     "orjson",
+#     "urllib3",
 # ]
 # ///
 
@@ -12,64 +14,432 @@ Sends Claude Code hook events to the observability server.
 """
 
 import json
+import mmap
 import sys
 import os
-import argparse
-import urllib.request
-import urllib.error
-from datetime import datetime
-from dotenv import load_dotenv
-from utils.summarizer import generate_event_summary
-from utils.server_discovery import get_events_endpoint
-
-def send_event_to_server(event_data, server_url=None):
-    """Send event data to the observability server with Docker fallback."""
-    try:
-        # Auto-discover server URL if not provided
-        if not server_url:
-            server_url = get_events_endpoint()
-            if not server_url:
-                print("Failed to discover observability server (tried localhost and host.docker.internal)", file=sys.stderr)
-                return False
-        
-        # Prepare the request
-        req = urllib.request.Request(
-            server_url,
-            data=json.dumps(event_data).encode('utf-8'),
-            headers={
-                'Content-Type': 'application/json',
-                'User-Agent': 'Claude-Code-Hook/1.0'
-            }
-        )
+import socket
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from utils.constants import DAEMON_ENABLED, SPOOL_ENABLED, get_daemon_socket_path, get_spool_dir
+
+try:
+    import orjson
+
+    decode_json = orjson.loads
+    encode_json = orjson.dumps
+except ImportError:
+    # orjson is optional; fall back to the much slower stdlib codec
+    decode_json = json.loads
+
+    def encode_json(obj):
+        return json.dumps(obj).encode('utf-8')
+
+# Flush streamed request bodies in chunks of about this many bytes
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Longest wait for a summary being generated alongside a synchronous send
+SUMMARY_TIMEOUT = 60  # seconds
+
+def iter_transcript_lines(transcript_path):
+    """
+    Yield the non-empty raw lines of a .jsonl transcript as bytes.
+    
+    The file is memory-mapped and split on newlines, so large transcripts
+    are paged in lazily and never decoded to text.
+    """
+    with open(transcript_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = 0
+            size = len(mm)
+            while pos < size:
+                end = mm.find(b'\n', pos)
+                if end == -1:
+                    end = size
+                line = mm[pos:end].strip()
+                if line:
+                    yield line
+                pos = end + 1
+
+def iter_event_body(event_data, transcript_path=None):
+    """
+    Yield the JSON-encoded event in chunks of roughly STREAM_CHUNK_SIZE bytes.
+    
+    When transcript_path is given, its valid lines are streamed in as the
+    event's "chat" array, so the transcript is never held in memory as a
+    whole.
+    """
+    encoded = encode_json(event_data)
+    if not transcript_path:
+        yield encoded
+        return
+    
+    buffer = bytearray(encoded[:-1])
+    buffer += b',"chat":['
+    first = True
+    for line in iter_transcript_lines(transcript_path):
+        try:
+            decode_json(line)
+        except ValueError:
+            continue  # Skip invalid lines
+        if not first:
+            buffer += b','
+        buffer += line
+        first = False
+        if len(buffer) >= STREAM_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b']}'
+    yield bytes(buffer)
+
+def multipart_envelope(encoded_event, boundary):
+    """
+    Build the bytes surrounding the transcript in a raw-chat multipart body.
+    
+    The "event" part holds the JSON-encoded event and the "chat" part holds
+    the transcript as application/x-ndjson.
+    
+    Returns:
+        tuple: (head, tail) bytes to send before and after the transcript
+    """
+    head = (
+        f'--{boundary}\r\n'
+        'Content-Disposition: form-data; name="event"\r\n'
+        'Content-Type: application/json\r\n\r\n'
+    ).encode('utf-8') + encoded_event + (
+        f'\r\n--{boundary}\r\n'
+        'Content-Disposition: form-data; name="chat"; filename="transcript.jsonl"\r\n'
+        'Content-Type: application/x-ndjson\r\n\r\n'
+    ).encode('utf-8')
+    tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+    return head, tail
+
+def iter_multipart_body(head, transcript_path, transcript_size, tail):
+    """Yield head, the first transcript_size bytes of the transcript unparsed, then tail."""
+    yield head
+    
+    # Claude Code may still be appending, so stop at the size measured up front
+    remaining = transcript_size
+    with open(transcript_path, 'rb') as f:
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    
+    yield tail
+
+def build_raw_chat_request(event_data, transcript_path):
+    """
+    Prepare a multipart request that forwards the transcript unparsed.
+    
+    Returns:
+        tuple: (body_factory, headers) where body_factory() returns a fresh
+            body iterator for each attempt
+    """
+    import uuid
+    
+    boundary = uuid.uuid4().hex
+    head, tail = multipart_envelope(encode_json(event_data), boundary)
+    transcript_size = os.path.getsize(transcript_path)
+    headers = {
+        'Content-Type': f'multipart/form-data; boundary={boundary}',
+        'Content-Length': str(len(head) + transcript_size + len(tail))
+    }
+    return (
+        lambda: iter_multipart_body(head, transcript_path, transcript_size, tail),
+        headers
+    )
+
+def post_event(url, data, headers=None):
+    """
+    POST encoded event data to an events endpoint.
+    
+    Args:
+        url (str): Full events endpoint URL
+        data (bytes or iterable): JSON-encoded event payload; an iterable of
+            byte chunks is sent with chunked transfer encoding unless
+            headers carries a Content-Length
+        headers (dict, optional): Extra headers, e.g. a multipart Content-Type
         
-        # Send the request
+    Returns:
+        tuple: (ok, error, body) where error is the exception raised, if
+            any, and body is the response body on success
+    """
+    # Only the synchronous send path needs urllib, so import it here
+    import urllib.error
+    import urllib.parse
+    import urllib.request
+    from utils.dns_cache import invalidate_host, resolve_url
+    
+    # Connect to the cached IP of the server's host to skip name resolution
+    resolved_url, request_headers = resolve_url(url)
+    request_headers.update({
+        'Content-Type': 'application/json',
+        'User-Agent': 'Claude-Code-Hook/1.0'
+    })
+    request_headers.update(headers or {})
+    req = urllib.request.Request(resolved_url, data=data, headers=request_headers)
+    
+    try:
         with urllib.request.urlopen(req, timeout=5) as response:
             if response.status == 200:
-                return True
-            else:
-                print(f"Server returned status: {response.status}", file=sys.stderr)
-                return False
-                
-    except urllib.error.URLError as e:
-        print(f"Failed to send event: {e}", file=sys.stderr)
+                return True, None, response.read()
+            return False, Exception(f"Server returned status: {response.status}"), None
+    except Exception as e:
+        if isinstance(e, urllib.error.URLError) and not isinstance(e, urllib.error.HTTPError):
+            invalidate_host(urllib.parse.urlsplit(url).hostname)
+        return False, e, None
+
+def patch_event_summary(events_url, response_body, summary):
+    """
+    Attach a summary to an event that has already been sent.
+    
+    The event id is read from the server's response to the POST, and the
+    summary is sent as PATCH {events_url}/{id}/summary.
+    
+    Returns:
+        bool: True if the server accepted the summary
+    """
+    import urllib.request
+    from utils.dns_cache import resolve_url
+    
+    try:
+        event_id = decode_json(response_body).get('id')
+    except (ValueError, TypeError, AttributeError):
+        event_id = None
+    if event_id is None:
+        print("Server response has no event id; summary not attached", file=sys.stderr)
         return False
+    
+    url, headers = resolve_url(f"{events_url}/{event_id}/summary")
+    headers.update({
+        'Content-Type': 'application/json',
+        'User-Agent': 'Claude-Code-Hook/1.0'
+    })
+    req = urllib.request.Request(url, data=encode_json({'summary': summary}), headers=headers, method='PATCH')
+    
+    try:
+        with urllib.request.urlopen(req, timeout=5) as response:
+            return response.status == 200
     except Exception as e:
-        print(f"Unexpected error: {e}", file=sys.stderr)
+        print(f"Failed to attach summary: {e}", file=sys.stderr)
         return False
 
-def main():
-    # Load environment variables
-    load_dotenv()
+def start_daemon(server_url=None):
+    """Start the send_event daemon in its own session so it outlives this hook."""
+    import subprocess
+    
+    command = [sys.executable, str(Path(__file__).parent / "send_event_daemon.py")]
+    if server_url:
+        command += ['--server-url', server_url]
+    try:
+        subprocess.Popen(
+            command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    except OSError:
+        pass
+
+def notify_daemon(server_url=None):
+    """Poke the send_event daemon so it drains the spool, starting it if needed."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1)
+            sock.connect(get_daemon_socket_path(server_url))
+    except OSError:
+        start_daemon(server_url)
+
+def spool_event(event_data, transcript_path=None, server_url=None):
+    """
+    Queue event data for the send_event daemon and return immediately.
+    
+    The event is appended to a per-process file in the spool directory for
+    server_url, which is only renamed to .jsonl once fully written so the
+    daemon never reads a partial event.
+    
+    Args:
+        event_data (dict): Event to send
+        transcript_path (str, optional): Transcript to stream in as the chat
+        server_url (str, optional): Configured server base URL; the event is
+            left to the daemon for that server, or to the auto-discovery
+            daemon without one
+    
+    Returns:
+        bool: True if the event was spooled
+    """
+    spool_dir = get_spool_dir(server_url)
+    spool_name = f"{time.time_ns()}-{os.getpid()}"
+    tmp_path = spool_dir / f"{spool_name}.tmp"
+    try:
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        try:
+            for chunk in iter_event_body(event_data, transcript_path):
+                os.write(fd, chunk)
+            os.write(fd, b'\n')
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, spool_dir / f"{spool_name}.jsonl")
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Failed to spool event: {e}", file=sys.stderr)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+    
+    notify_daemon(server_url)
+    return True
+
+def send_event_to_server(event_data, server_url=None, transcript_path=None, chat_raw=False):
+    """
+    Send event data to the observability server with Docker fallback.
+    
+    POSTs straight to each candidate server instead of probing first; only a
+    connection failure moves on to the next candidate. A transcript is
+    streamed into the request body rather than loaded up front, either as
+    the event's chat array or, with chat_raw, as raw JSONL in a multipart
+    body.
+    
+    Returns:
+        tuple: (events_url, response_body) for the endpoint that accepted
+            the event, or None if it could not be sent
+    """
+    import urllib.error
+    from utils.server_discovery import (
+        get_candidate_urls,
+        get_configured_server_url,
+        invalidate_server_cache,
+        write_cached_server_url,
+    )
+    
+    headers = None
+    try:
+        if transcript_path and chat_raw:
+            body, headers = build_raw_chat_request(event_data, transcript_path)
+        elif transcript_path:
+            # Each attempt needs a fresh stream over the transcript
+            body = lambda: iter_event_body(event_data, transcript_path)
+        else:
+            data = encode_json(event_data)
+            body = lambda: data
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Failed to encode event: {e}", file=sys.stderr)
+        return None
+    
+    # An explicit endpoint gets a single attempt
+    if server_url:
+        ok, error, response_body = post_event(server_url, body(), headers)
+        if not ok:
+            print(f"Failed to send event: {error}", file=sys.stderr)
+            return None
+        return server_url, response_body
+    
+    # Only auto-discovered servers go into the cache shared by all projects
+    auto_discovery = not get_configured_server_url()
+    candidates = get_candidate_urls()
+    for base_url in candidates:
+        events_url = f"{base_url}/events"
+        ok, error, response_body = post_event(events_url, body(), headers)
+        if ok:
+            if auto_discovery:
+                write_cached_server_url(base_url)
+            return events_url, response_body
+        # The server answered, so another candidate won't do better
+        if not isinstance(error, urllib.error.URLError) or isinstance(error, urllib.error.HTTPError):
+            print(f"Failed to send event: {error}", file=sys.stderr)
+            return None
     
+    # Every candidate refused the connection, so the cached server URL is stale
+    if auto_discovery:
+        invalidate_server_cache()
+    print(f"Failed to reach observability server (tried {', '.join(candidates)})", file=sys.stderr)
+    return None
+
+USAGE = """\
+usage: send_event.py [-h] [--source-app SOURCE_APP] --event-type EVENT_TYPE
+                     [--server-url SERVER_URL] [--add-chat] [--chat-raw]
+                     [--summarize]
+
+Send Claude Code hook events to observability server
+
+options:
+  -h, --help            show this help message and exit
+  --source-app SOURCE_APP
+                        Source application name (can be set via APP_NAME env var)
+  --event-type EVENT_TYPE
+                        Hook event type (PreToolUse, PostToolUse, etc.)
+  --server-url SERVER_URL
+                        Events endpoint URL (defaults to OBSERVABILITY_SERVER_URL
+                        env var or auto-discovery)
+  --add-chat            Include chat transcript if available
+  --chat-raw            With --add-chat, send the transcript unparsed as JSONL in
+                        a multipart body
+  --summarize           Generate AI summary of the event
+"""
+
+VALUE_OPTIONS = {'--source-app': 'source_app', '--event-type': 'event_type', '--server-url': 'server_url'}
+FLAG_OPTIONS = {'--add-chat': 'add_chat', '--chat-raw': 'chat_raw', '--summarize': 'summarize'}
+
+def usage_error(message):
+    """Print usage and an error message, then exit like argparse does."""
+    print(USAGE.split('\n\n')[0], file=sys.stderr)
+    print(f"send_event.py: error: {message}", file=sys.stderr)
+    sys.exit(2)
+
+def parse_args(argv):
+    """
+    Parse send_event.py's command line.
+    
+    Hand-rolled instead of argparse, whose import and parser setup cost more
+    than the rest of a spooled hook run. Accepts both "--opt value" and
+    "--opt=value".
+    
+    Returns:
+        SimpleNamespace: Parsed options with argparse-style attribute names
+    """
+    args = {name: None for name in VALUE_OPTIONS.values()}
+    args.update({name: False for name in FLAG_OPTIONS.values()})
+    
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        option, has_value, value = arg.partition('=')
+        if arg in ('-h', '--help'):
+            print(USAGE, end='')
+            sys.exit(0)
+        elif option in VALUE_OPTIONS:
+            if not has_value:
+                i += 1
+                if i >= len(argv) or argv[i].startswith('--'):
+                    usage_error(f"argument {option}: expected one argument")
+                value = argv[i]
+            args[VALUE_OPTIONS[option]] = value
+        elif arg in FLAG_OPTIONS:
+            args[FLAG_OPTIONS[arg]] = True
+        else:
+            usage_error(f"unrecognized arguments: {arg}")
+        i += 1
+    
+    if args['event_type'] is None:
+        usage_error("the following arguments are required: --event-type")
+    
+    return SimpleNamespace(**args)
+
+def main():
     # Parse command line arguments
-    parser = argparse.ArgumentParser(description='Send Claude Code hook events to observability server')
-    parser.add_argument('--source-app', help='Source application name (can be set via APP_NAME env var)')
-    parser.add_argument('--event-type', required=True, help='Hook event type (PreToolUse, PostToolUse, etc.)')
-    parser.add_argument('--server-url', help='Server URL (can be set via OBSERVABILITY_SERVER_URL env var)')
-    parser.add_argument('--add-chat', action='store_true', help='Include chat transcript if available')
-    parser.add_argument('--summarize', action='store_true', help='Generate AI summary of the event')
+    args = parse_args(sys.argv[1:])
     
-    args = parser.parse_args()
+    # Load environment variables
+    from dotenv import load_dotenv
+    load_dotenv()
     
     # Get source app from args or environment
     source_app = args.source_app or os.getenv('APP_NAME')
@@ -77,15 +447,6 @@ def main():
         print("Error: --source-app argument or APP_NAME environment variable is required", file=sys.stderr)
         sys.exit(1)
     
-    # Get server URL from args, environment, or auto-discovery
-    if args.server_url:
-        server_url = args.server_url
-    else:
-        server_url = get_events_endpoint()
-        if not server_url:
-            print("Error: Could not discover observability server. Tried localhost and host.docker.internal", file=sys.stderr)
-            sys.exit(1)
-    
     try:
         # Read hook data from stdin
         input_data = json.load(sys.stdin)
@@ -99,39 +460,55 @@ def main():
         'session_id': input_data.get('session_id', 'unknown'),
         'hook_event_type': args.event_type,
         'payload': input_data,
-        'timestamp': int(datetime.now().timestamp() * 1000)
+        'timestamp': time.time_ns() // 1_000_000
     }
     
-    # Handle --add-chat option
+    # Handle --add-chat option; the transcript is streamed in as the chat
+    # array when the event is written out
+    transcript_path = None
     if args.add_chat and 'transcript_path' in input_data:
-        transcript_path = input_data['transcript_path']
-        if os.path.exists(transcript_path):
-            # Read .jsonl file and convert to JSON array
-            chat_data = []
-            try:
-                with open(transcript_path, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            try:
-                                chat_data.append(json.loads(line))
-                            except json.JSONDecodeError:
-                                pass  # Skip invalid lines
-                
-                # Add chat to event data
-                event_data['chat'] = chat_data
-            except Exception as e:
-                print(f"Failed to read transcript: {e}", file=sys.stderr)
-    
-    # Generate summary if requested
+        if os.path.exists(input_data['transcript_path']):
+            transcript_path = input_data['transcript_path']
+    
+    # Hand off to the daemon unless the event must be sent synchronously;
+    # the spool only carries JSON events, so raw transcripts go direct
+    chat_raw = bool(transcript_path) and args.chat_raw
+    use_spool = (SPOOL_ENABLED and DAEMON_ENABLED and not args.server_url
+                 and not chat_raw and hasattr(socket, 'AF_UNIX'))
+    
+    # Generate summary if requested. It is sent inline with the event, except
+    # for a synchronous send with OBSERVABILITY_SUMMARY_PATCH=1: then it is
+    # generated alongside the POST and PATCHed onto the stored event after.
+    summary_thread = None
+    summary_result = {}
     if args.summarize:
-        summary = generate_event_summary(event_data)
-        if summary:
-            event_data['summary'] = summary
-        # Continue even if summary generation fails
+        from utils.summarizer import generate_event_summary
+        if use_spool or os.getenv('OBSERVABILITY_SUMMARY_PATCH') != '1':
+            summary = generate_event_summary(event_data)
+            if summary:
+                event_data['summary'] = summary
+            # Continue even if summary generation fails
+        else:
+            import threading
+            summary_thread = threading.Thread(
+                target=lambda: summary_result.update(summary=generate_event_summary(event_data)),
+                daemon=True
+            )
+            summary_thread.start()
     
-    # Send to server
-    success = send_event_to_server(event_data, server_url)
+    # Route spooled events to this project's configured server, not to
+    # whichever server a shared daemon would discover
+    spooled = use_spool and spool_event(
+        event_data, transcript_path, os.getenv('OBSERVABILITY_SERVER_URL')
+    )
+    if not spooled:
+        sent = send_event_to_server(event_data, args.server_url, transcript_path, chat_raw)
+        if summary_thread is not None:
+            # The summary thread dies with this process, so wait for it
+            summary_thread.join(SUMMARY_TIMEOUT)
+            summary = summary_result.get('summary')
+            if summary and sent:
+                patch_event_summary(*sent, summary)
     
     # Always exit with 0 to not block Claude Code operations
     sys.exit(0)
@@ -0,0 +1,461 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#     "python-dotenv",
+#     "urllib3",
+# ]
+# ///
+
+"""
+Send Event Daemon
+Long-lived sidecar that forwards hook events to the observability server
+over pooled keep-alive HTTP connections.
+
+send_event.py appends each event to a file in the spool directory and
+pokes the daemon's Unix domain socket, starting the daemon on first use.
+Hooks with a configured OBSERVABILITY_SERVER_URL get a spool directory and
+daemon of their own for that server, so each daemon forwards to exactly
+one target.
+The daemon drains the spool whenever it is poked and every POLL_INTERVAL
+seconds, and exits on its own after IDLE_TIMEOUT seconds without events.
+"""
+
+import os
+import sys
+import gzip
+import argparse
+import time
+import socket
+import threading
+import http.client
+import urllib.parse
+from utils.constants import SPOOL_DIR, get_daemon_socket_path, get_spool_dir
+
+try:
+    import urllib3
+except ImportError:
+    urllib3 = None  # fall back to a single http.client connection
+
+from utils.server_discovery import discover_server_url, invalidate_server_cache
+
+IDLE_TIMEOUT = 600  # seconds
+POLL_INTERVAL = 2  # seconds
+SPOOL_MAX_AGE = 3600  # seconds; older undelivered events are dropped
+BATCH_SIZE = 64  # events per /events/batch POST
+BATCH_MAX_BYTES = 1024 * 1024  # uncompressed bytes per /events/batch POST
+GZIP_THRESHOLD = 4096  # bytes; larger batch bodies are gzip-compressed
+POOL_MAXSIZE = 8  # keep-alive connections held open by urllib3
+
+
+class EventForwarder:
+    """
+    Forwards events to the observability server over keep-alive connections.
+
+    Uses a urllib3 connection pool when urllib3 is installed, otherwise a
+    single http.client connection guarded by a lock.
+
+    Args:
+        server_url (str, optional): Configured server base URL; without one
+            the server is auto-discovered
+    """
+
+    def __init__(self, server_url=None):
+        self.server_url = server_url
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pool = None
+        self._base_path = None
+        # Flipped off once the server turns out not to have /events/batch
+        self.batch_supported = True
+
+    def _connect(self):
+        """Find the server and open a new connection to it."""
+        # Discovery must not fall back on this daemon's own environment,
+        # which need not match that of the hooks it serves; the shared
+        # cache it reads only ever holds auto-discovered URLs
+        base_url = self.server_url or discover_server_url(use_env=False)
+        if not base_url:
+            return False
+
+        parts = urllib.parse.urlsplit(base_url)
+        self._base_path = parts.path.rstrip('/')
+        if urllib3 is not None:
+            self._pool = urllib3.connection_from_url(
+                base_url,
+                maxsize=POOL_MAXSIZE,
+                timeout=urllib3.Timeout(total=5),
+                retries=urllib3.Retry(total=1, redirect=False, raise_on_status=False)
+            )
+            return True
+
+        if parts.scheme == 'https':
+            self._conn = http.client.HTTPSConnection(parts.hostname, parts.port or 443, timeout=5)
+        else:
+            self._conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=5)
+        return True
+
+    def _forget_server(self):
+        """Server moved or went away, so force a fresh discovery."""
+        if not self.server_url:
+            invalidate_server_cache()
+
+    def _close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _pool_request(self, path, body, headers):
+        """POST through the urllib3 pool, which reconnects dropped connections itself."""
+        with self._lock:
+            if self._pool is None and not self._connect():
+                return None
+            pool = self._pool
+        try:
+            response = pool.urlopen('POST', self._base_path + path, body=body, headers=headers)
+            return response.status
+        except urllib3.exceptions.HTTPError as e:
+            with self._lock:
+                if self._pool is pool:
+                    self._close()
+            self._forget_server()
+            print(f"Failed to send event: {e}", file=sys.stderr)
+            return None
+
+    def _post(self, path, body, headers):
+        self._conn.request('POST', self._base_path + path, body=body, headers=headers)
+        response = self._conn.getresponse()
+        # Drain the body so the connection can be reused
+        response.read()
+        if response.will_close:
+            self._close()
+        return response.status
+
+    def _request(self, path, body, extra_headers=None):
+        """
+        POST body to path, reconnecting if the connection dropped.
+
+        Returns:
+            int: HTTP status code, or None if the server is unreachable
+        """
+        headers = {
+            'Content-Type': 'application/json',
+            'User-Agent': 'Claude-Code-Hook/1.0',
+            'Connection': 'keep-alive'
+        }
+        headers.update(extra_headers or {})
+
+        if urllib3 is not None:
+            return self._pool_request(path, body, headers)
+
+        with self._lock:
+            for attempt in range(2):
+                if self._conn is None and not self._connect():
+                    return None
+                try:
+                    return self._post(path, body, headers)
+                except (OSError, http.client.HTTPException) as e:
+                    self._close()
+                    if attempt:
+                        self._forget_server()
+                        print(f"Failed to send event: {e}", file=sys.stderr)
+            return None
+
+    def send(self, data):
+        """
+        POST one encoded event to /events.
+
+        Args:
+            data (bytes): JSON-encoded event payload
+
+        Returns:
+            int: HTTP status code, or None if the server is unreachable
+        """
+        return self._request('/events', data)
+
+    def send_batch(self, events):
+        """
+        POST encoded events as one JSON array to /events/batch.
+
+        Bodies larger than GZIP_THRESHOLD bytes are gzip-compressed.
+
+        Args:
+            events (list): JSON-encoded event payloads
+
+        Returns:
+            int: HTTP status code, or None if the server is unreachable;
+            batch_supported is cleared if the server has no batch endpoint
+        """
+        body = b'[' + b','.join(events) + b']'
+        extra_headers = None
+        if len(body) > GZIP_THRESHOLD:
+            body = gzip.compress(body)
+            extra_headers = {'Content-Encoding': 'gzip'}
+
+        status = self._request('/events/batch', body, extra_headers)
+        if status in (404, 405):
+            self.batch_supported = False
+        return status
+
+
+def read_spool_file(spool_file):
+    """
+    Read the events in a spool file, dropping the file if it has expired.
+
+    Returns:
+        list: Encoded events, or None if the file is gone or expired
+    """
+    try:
+        if time.time() - spool_file.stat().st_mtime > SPOOL_MAX_AGE:
+            spool_file.unlink()
+            return None
+        return [line for line in spool_file.read_bytes().splitlines() if line.strip()]
+    except OSError:
+        return None
+
+
+def remove_spool_files(spool_files):
+    for spool_file in spool_files:
+        try:
+            spool_file.unlink()
+        except OSError:
+            pass
+
+
+def is_retryable(status):
+    """
+    Return True if events sent with this result must stay in the spool.
+
+    Only a 4xx other than 404, 405 and 429 says the events themselves are
+    bad. An unreachable server, a 5xx or a 429 is usually temporary, and
+    SPOOL_MAX_AGE bounds how long such events are retried.
+    """
+    if status is None:
+        return True
+    if 200 <= status < 300:
+        return False
+    return not 400 <= status < 500 or status in (404, 405, 429)
+
+
+def send_spool_batch(forwarder, batch_files, batch):
+    """
+    Send one batch and remove its spool files unless it must be retried.
+
+    A batch the server rejects is resent one event at a time, so only the
+    events it objects to are dropped; that also covers a batch endpoint
+    that refuses gzip bodies.
+
+    Returns:
+        bool: False if delivery stopped early, None if the server has no
+        batch endpoint
+    """
+    status = forwarder.send_batch(batch)
+    if not forwarder.batch_supported:
+        return None
+    if is_retryable(status):
+        return False
+    if not 200 <= status < 300:
+        return drain_spool_single(forwarder, batch_files)
+    remove_spool_files(batch_files)
+    return True
+
+
+def drain_spool_batched(forwarder, spool_files):
+    """
+    Deliver spooled events in batches of up to BATCH_SIZE events and
+    BATCH_MAX_BYTES bytes.
+
+    A spool file larger than BATCH_MAX_BYTES is sent as a batch of its own.
+
+    Returns:
+        bool: False if delivery stopped early, None if the server has no
+        batch endpoint
+    """
+    batch_files, batch, batch_bytes = [], [], 0
+    for spool_file in spool_files:
+        try:
+            file_bytes = spool_file.stat().st_size
+        except OSError:
+            continue
+        if batch and batch_bytes + file_bytes > BATCH_MAX_BYTES:
+            sent = send_spool_batch(forwarder, batch_files, batch)
+            if not sent:
+                return sent
+            batch_files, batch, batch_bytes = [], [], 0
+
+        events = read_spool_file(spool_file)
+        if events is None:
+            continue
+        batch_files.append(spool_file)
+        batch.extend(events)
+        batch_bytes += file_bytes
+
+        if len(batch) >= BATCH_SIZE or batch_bytes >= BATCH_MAX_BYTES:
+            sent = send_spool_batch(forwarder, batch_files, batch)
+            if not sent:
+                return sent
+            batch_files, batch, batch_bytes = [], [], 0
+
+    if batch:
+        return send_spool_batch(forwarder, batch_files, batch)
+    return True
+
+
+def drain_spool_single(forwarder, spool_files):
+    """
+    Deliver spooled events one POST at a time, oldest first.
+
+    Events the server rejects are dropped; see is_retryable().
+    """
+    for spool_file in spool_files:
+        events = read_spool_file(spool_file)
+        if events is None:
+            continue
+
+        for index, line in enumerate(events):
+            status = forwarder.send(line)
+            if is_retryable(status):
+                # Keep only what is still undelivered
+                if index:
+                    tmp_file = spool_file.with_suffix('.tmp')
+                    tmp_file.write_bytes(b'\n'.join(events[index:]) + b'\n')
+                    os.replace(tmp_file, spool_file)
+                return False
+            if not 200 <= status < 300:
+                print(f"Server rejected event with status {status}; dropping it", file=sys.stderr)
+
+        remove_spool_files([spool_file])
+    return True
+
+
+def drain_spool(forwarder, spool_dir=SPOOL_DIR):
+    """
+    Deliver every spooled event, oldest first.
+
+    Stops at the first delivery that must be retried (see is_retryable())
+    and keeps the undelivered events on disk for the next pass.
+    """
+    try:
+        spool_files = sorted(spool_dir.glob('*.jsonl'))
+    except OSError:
+        return
+
+    if forwarder.batch_supported:
+        if drain_spool_batched(forwarder, spool_files) is not None:
+            return
+        # Server has no batch endpoint; pick up where batching left off
+        spool_files = [spool_file for spool_file in spool_files if spool_file.exists()]
+    drain_spool_single(forwarder, spool_files)
+
+
+def drain_loop(forwarder, wake, stop, spool_dir=SPOOL_DIR):
+    """Drain the spool when woken by a client or every POLL_INTERVAL seconds."""
+    while not stop.is_set():
+        drain_spool(forwarder, spool_dir)
+        wake.wait(POLL_INTERVAL)
+        wake.clear()
+
+
+def handle_client(conn, wake):
+    """Wake the drainer for a client that has just spooled an event."""
+    with conn:
+        wake.set()
+
+
+def acquire_daemon_lock(spool_dir):
+    """
+    Take the exclusive lock file in spool_dir without blocking.
+
+    The lock lives with the spool it protects rather than with the socket,
+    so daemons started with different socket paths still can't both drain
+    the same spool. Only the lock holder touches its socket.
+
+    Returns:
+        file: Open lock file to keep for the daemon's lifetime, or None if
+        another daemon holds the lock
+    """
+    import fcntl
+
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    lock_file = open(spool_dir / ".daemon.lock", 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+
+def serve(server_url=None):
+    """
+    Accept hook pokes and drain the spool until IDLE_TIMEOUT passes without any.
+
+    Args:
+        server_url (str, optional): Configured server base URL whose spool
+            this daemon drains; without one it drains the auto-discovery spool
+    """
+    socket_path = get_daemon_socket_path(server_url)
+    spool_dir = get_spool_dir(server_url)
+    lock_file = acquire_daemon_lock(spool_dir)
+    if lock_file is None:
+        return
+    os.makedirs(os.path.dirname(socket_path), mode=0o700, exist_ok=True)
+
+    try:
+        # With the lock held, a socket left on disk belongs to a daemon that died
+        try:
+            os.remove(socket_path)
+        except OSError:
+            pass
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        server.listen(64)
+        server.settimeout(IDLE_TIMEOUT)
+
+        forwarder = EventForwarder(server_url)
+        wake = threading.Event()
+        stop = threading.Event()
+        drainer = threading.Thread(
+            target=drain_loop,
+            args=(forwarder, wake, stop, spool_dir),
+            daemon=True
+        )
+        drainer.start()
+        try:
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    break
+                handle_client(conn, wake)
+        finally:
+            server.close()
+            stop.set()
+            wake.set()
+            drainer.join(timeout=10)
+            try:
+                os.remove(socket_path)
+            except OSError:
+                pass
+    finally:
+        lock_file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Forward spooled hook events to the observability server')
+    parser.add_argument('--server-url', help='Configured server base URL (default: auto-discovery)')
+    args = parser.parse_args()
+
+    if not hasattr(socket, 'AF_UNIX'):
+        print("Error: Unix domain sockets are not supported on this platform", file=sys.stderr)
+        sys.exit(1)
+    serve(args.server_url)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env bash
+#
+# Pre-build one virtualenv for the Claude Code hooks.
+#
+# Running a hook through `uv run --script` resolves its PEP 723 dependencies
+# on every invocation. This script installs the union of those dependencies
+# into a single venv once, then points the hook shebangs and the commands in
+# .claude/settings.json at that venv's interpreter. The PEP 723 blocks are
+# left in place, so `uv run` keeps working as a fallback.
+#
+# Usage:
+#   .claude/hooks/setup_hooks.sh             # build venv and patch hooks
+#   .claude/hooks/setup_hooks.sh --no-patch  # only build the venv
+#
+# Set CLAUDE_HOOKS_VENV to build the venv somewhere other than
+# ~/.claude/hooks/.venv.
+
+set -euo pipefail
+
+HOOKS_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+SETTINGS_FILE="$(dirname "$HOOKS_DIR")/settings.json"
+VENV_DIR="${CLAUDE_HOOKS_VENV:-$HOME/.claude/hooks/.venv}"
+
+PATCH=1
+if [ "${1:-}" = "--no-patch" ]; then
+    PATCH=0
+fi
+
+# Collect every dependency declared in the hooks' PEP 723 blocks
+DEPENDENCIES=()
+while IFS= read -r dep; do
+    DEPENDENCIES+=("$dep")
+done < <(
+    find "$HOOKS_DIR" -name '*.py' -not -path '*/.venv/*' -exec \
+        sed -n '/^# dependencies = \[/,/^# \]/s/^#[[:space:]]*"\([^"]*\)",\{0,1\}$/\1/p' {} + |
+        sort -u
+)
+
+echo "Creating hooks venv at $VENV_DIR"
+if command -v uv >/dev/null 2>&1; then
+    uv venv --quiet --allow-existing "$VENV_DIR"
+else
+    python3 -m venv "$VENV_DIR"
+fi
+
+if [ -x "$VENV_DIR/bin/python" ]; then
+    VENV_PYTHON="$VENV_DIR/bin/python"
+else
+    VENV_PYTHON="$VENV_DIR/Scripts/python.exe"
+fi
+
+echo "Installing: ${DEPENDENCIES[*]}"
+if command -v uv >/dev/null 2>&1; then
+    uv pip install --quiet --python "$VENV_PYTHON" "${DEPENDENCIES[@]}"
+else
+    "$VENV_PYTHON" -m pip install --quiet "${DEPENDENCIES[@]}"
+fi
+
+if [ "$PATCH" -eq 0 ]; then
+    echo "Done. Run hooks with $VENV_PYTHON"
+    exit 0
+fi
+
+# Point uv-run shebangs at the venv interpreter
+for script in $(grep -rl --include='*.py' '^#!/usr/bin/env -S uv run --script' "$HOOKS_DIR"); do
+    sed -i.bak "1s|^#!/usr/bin/env -S uv run --script\$|#!$VENV_PYTHON|" "$script"
+    rm -f "$script.bak"
+    echo "Patched shebang: ${script#"$HOOKS_DIR"/}"
+done
+
+# Run hook commands with the venv interpreter instead of `uv run`
+if [ -f "$SETTINGS_FILE" ] && grep -q '"uv run ' "$SETTINGS_FILE"; then
+    cp "$SETTINGS_FILE" "$SETTINGS_FILE.backup"
+    sed -i.bak "s|\"uv run |\"$VENV_PYTHON |g" "$SETTINGS_FILE"
+    rm -f "$SETTINGS_FILE.bak"
+    echo "Patched hook commands in $SETTINGS_FILE (backup: settings.json.backup)"
+fi
+
+echo "Done."
@@ -8,12 +8,80 @@ Constants for Claude Code Hooks.
 """
 
 import os
+import hashlib
 from pathlib import Path
 
 # Base directory for all logs
 # Default is 'logs' in the current working directory
 LOG_BASE_DIR = os.environ.get("CLAUDE_HOOKS_LOG_DIR", "logs")
 
+# Per-user directory for the send_event daemon's socket and lock file;
+# $XDG_RUNTIME_DIR is private to the user where the platform provides one
+DAEMON_RUNTIME_DIR = (
+    Path(os.environ["XDG_RUNTIME_DIR"]) / "claude-hooks"
+    if os.environ.get("XDG_RUNTIME_DIR")
+    else Path.home() / ".claude" / "hooks" / "run"
+)
+
+# Unix domain socket the send_event daemon for auto-discovered servers
+# listens on; daemons for configured servers get their own, see
+# get_daemon_socket_path()
+DAEMON_SOCKET_PATH = os.environ.get("CLAUDE_HOOKS_SOCKET", str(DAEMON_RUNTIME_DIR / "daemon.sock"))
+
+# Events waiting for the daemon to deliver them to an auto-discovered server,
+# one .jsonl file per hook run; see get_spool_dir()
+SPOOL_DIR = Path.home() / ".claude" / "hooks" / "spool"
+
+# Set SPOOL_DISABLED=1 to send events synchronously from the hook
+SPOOL_ENABLED = os.environ.get("SPOOL_DISABLED", "0") != "1"
+
+# Set CLAUDE_HOOKS_DAEMON=0 to always send events directly from the hook
+DAEMON_ENABLED = os.environ.get("CLAUDE_HOOKS_DAEMON", "1") != "0"
+
+def get_target_id(server_url: str) -> str:
+    """
+    Get a short, filesystem-safe id for a configured server URL.
+    
+    Args:
+        server_url: Configured observability server base URL
+        
+    Returns:
+        Hex digest identifying the server
+    """
+    return hashlib.sha256(server_url.encode('utf-8')).hexdigest()[:16]
+
+def get_spool_dir(server_url: str = None) -> Path:
+    """
+    Get the spool directory for events bound for one server.
+    
+    Each configured server gets its own subdirectory, so the daemon that
+    drains it only ever forwards to that server.
+    
+    Args:
+        server_url: Configured server base URL, or None for auto-discovery
+        
+    Returns:
+        Path object for the spool directory
+    """
+    if not server_url:
+        return SPOOL_DIR
+    return SPOOL_DIR / get_target_id(server_url)
+
+def get_daemon_socket_path(server_url: str = None) -> str:
+    """
+    Get the socket path of the daemon that forwards to one server.
+    
+    Args:
+        server_url: Configured server base URL, or None for auto-discovery
+        
+    Returns:
+        Path of the daemon's Unix domain socket
+    """
+    if not server_url:
+        return DAEMON_SOCKET_PATH
+    root, ext = os.path.splitext(DAEMON_SOCKET_PATH)
+    return f"{root}-{get_target_id(server_url)}{ext}"
+
 def get_session_log_dir(session_id: str) -> Path:
     """
     Get the log directory for a specific session.
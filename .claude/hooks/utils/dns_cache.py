@@ -0,0 +1,151 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# requires-python = ">=3.8"
+# ///
+
+"""
+Hostname resolution cache shared by hook invocations.
+Keeps resolved server addresses on disk so each hook run can skip getaddrinfo.
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+import ipaddress
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+# Kept next to the server URL cache, in a directory only this user can write
+DNS_CACHE_PATH = Path.home() / ".claude" / "hooks" / ".dns_cache"
+DNS_CACHE_TTL = 300  # seconds
+
+# Serializes read-modify-write updates from concurrent discovery probes
+_cache_lock = threading.Lock()
+
+
+def _read_cache():
+    try:
+        with open(DNS_CACHE_PATH, 'r') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(cache):
+    """Atomically replace the cache file."""
+    tmp_path = DNS_CACHE_PATH.with_name(
+        f"{DNS_CACHE_PATH.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        DNS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, DNS_CACHE_PATH)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def is_loopback_host(hostname):
+    """Return True for localhost names and loopback IP literals."""
+    hostname = hostname.lower().rstrip('.')
+    if hostname == 'localhost' or hostname.endswith('.localhost'):
+        return True
+    try:
+        return ipaddress.ip_address(hostname).is_loopback
+    except ValueError:
+        return False
+
+
+def resolve_addresses(hostname, port):
+    """
+    Resolve a hostname to its IP addresses, using the on-disk cache when fresh.
+
+    Args:
+        hostname (str): Hostname like 'host.docker.internal'
+        port (int): Port used for the lookup
+
+    Returns:
+        list: IP addresses in getaddrinfo order, empty if the name doesn't
+            resolve
+    """
+    # Anything but a fresh [[ip, ...], expires] entry counts as a miss
+    entry = _read_cache().get(hostname)
+    if (isinstance(entry, list) and len(entry) == 2
+            and isinstance(entry[0], list) and entry[0]
+            and all(isinstance(ip, str) for ip in entry[0])
+            and isinstance(entry[1], (int, float)) and entry[1] > time.time()):
+        return entry[0]
+
+    try:
+        infos = socket.getaddrinfo(hostname, port, type=socket.SOCK_STREAM)
+    except OSError:
+        return []
+
+    addresses = []
+    for info in infos:
+        if info[4][0] not in addresses:
+            addresses.append(info[4][0])
+    if addresses:
+        # Re-read under the lock so entries other probes wrote meanwhile survive
+        with _cache_lock:
+            cache = _read_cache()
+            cache[hostname] = [addresses, time.time() + DNS_CACHE_TTL]
+            _write_cache(cache)
+    return addresses
+
+
+def invalidate_host(hostname):
+    """Drop a hostname from the cache so the next lookup resolves it again."""
+    with _cache_lock:
+        cache = _read_cache()
+        if cache.pop(hostname, None) is not None:
+            _write_cache(cache)
+
+
+def resolve_url(url):
+    """
+    Rewrite an http URL to point at the cached IP of its host.
+
+    The URL is returned as is when rewriting could send the request
+    somewhere else than urllib would:
+    - HTTPS URLs, since TLS verification needs the original hostname
+    - IP addresses and localhost names, which resolve locally anyway
+    - hosts with several addresses, so urllib still tries each in turn
+    - when a proxy is configured, so NO_PROXY still matches the hostname
+
+    Args:
+        url (str): URL like 'http://host.docker.internal:4000/events'
+
+    Returns:
+        tuple: (url, headers) where headers carries the original Host header
+            if the URL was rewritten
+    """
+    parts = urllib.parse.urlsplit(url)
+    hostname = parts.hostname
+    if parts.scheme != 'http' or not hostname or is_loopback_host(hostname):
+        return url, {}
+    try:
+        ipaddress.ip_address(hostname)
+        return url, {}
+    except ValueError:
+        pass
+    if urllib.request.getproxies().get('http'):
+        return url, {}
+
+    port = parts.port or 80
+    addresses = resolve_addresses(hostname, port)
+    if len(addresses) != 1:
+        return url, {}
+
+    ip = addresses[0]
+    ip_host = f"[{ip}]" if ':' in ip else ip
+    netloc = f"{ip_host}:{parts.port}" if parts.port else ip_host
+    host_header = f"{hostname}:{parts.port}" if parts.port else hostname
+    return urllib.parse.urlunsplit(parts._replace(netloc=netloc)), {'Host': host_header}
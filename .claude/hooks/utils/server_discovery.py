@@ -12,88 +12,263 @@ Handles automatic fallback from localhost to host.docker.internal.
 """
 
 import os
+import json
+import time
+import socket
+import threading
+import urllib.parse
 import urllib.request
 import urllib.error
+from functools import lru_cache
+from pathlib import Path
 from dotenv import load_dotenv
 
+# Imported both as utils.server_discovery and, from the llm helpers, as a
+# top-level module with utils/ on sys.path
+try:
+    from .dns_cache import resolve_addresses, resolve_url, invalidate_host
+except ImportError:
+    from dns_cache import resolve_addresses, resolve_url, invalidate_host
 
-def discover_server_url(base_url=None):
+# Discovered base URL is cached on disk so each hook invocation can skip probing
+CACHE_PATH = Path.home() / ".claude" / "hooks" / ".server_url_cache"
+CACHE_TTL = 60  # seconds
+
+PROBE_TIMEOUT = 0.2  # seconds per TCP connect attempt
+# Extra time discover_server_url() waits on probes, mostly for name
+# resolution, which has no timeout of its own
+PROBE_MARGIN = 1.0  # seconds
+
+
+def read_cached_server_url():
     """
-    Discover the correct observability server URL.
+    Read the cached server URL if it is still fresh.
     
-    Tries in order:
-    1. Provided base_url
-    2. OBSERVABILITY_SERVER_URL environment variable  
-    3. localhost:4000
-    4. host.docker.internal:4000 (Docker fallback)
+    Returns:
+        str: Cached base URL, or None if missing, expired or unreadable
+    """
+    try:
+        if time.time() - CACHE_PATH.stat().st_mtime > CACHE_TTL:
+            return None
+        with open(CACHE_PATH, 'r') as f:
+            return json.load(f).get('url')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def write_cached_server_url(url):
+    """
+    Atomically write the discovered server URL to the cache file.
     
     Args:
-        base_url (str, optional): Base URL to try first
-        
+        url (str): Working base URL like 'http://localhost:4000'
+    """
+    tmp_path = CACHE_PATH.with_name(f"{CACHE_PATH.name}.{os.getpid()}.tmp")
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump({'url': url, 'timestamp': time.time()}, f)
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def invalidate_server_cache():
+    """Delete the cached server URL so the next lookup re-probes."""
+    try:
+        os.remove(CACHE_PATH)
+    except OSError:
+        pass
+
+
+@lru_cache(maxsize=None)
+def running_in_docker():
+    """
+    Detect whether the hooks run inside a Docker container.
+    
+    Checked once per process: /.dockerenv exists or CLAUDE_IN_DOCKER is set.
+    
     Returns:
-        str: Working server URL, or None if none work
+        bool: True inside Docker
     """
-    load_dotenv()
+    return os.path.exists('/.dockerenv') or bool(os.environ.get('CLAUDE_IN_DOCKER'))
+
+
+def get_configured_server_url():
+    """
+    Get the server base URL configured for this project.
     
-    # Candidate URLs to try
-    candidates = []
+    Returns:
+        str: OBSERVABILITY_SERVER_URL from the environment or .env, or None
+    """
+    load_dotenv()
+    return os.getenv('OBSERVABILITY_SERVER_URL') or None
+
+
+def get_candidate_urls(base_url=None, use_env=True):
+    """
+    Build the ordered list of candidate observability server base URLs.
     
-    # 1. Explicit base_url provided
-    if base_url:
-        candidates.append(base_url)
+    Order:
+    1. Provided base_url
+    2. OBSERVABILITY_SERVER_URL environment variable
+    3. Cached URL from a previous auto-discovery, only if neither of the
+       above is set
+    4. localhost:4000
+    5. host.docker.internal:4000 (Docker fallback, only inside Docker)
     
-    # 2. Environment variable
-    env_url = os.getenv('OBSERVABILITY_SERVER_URL')
-    if env_url:
-        candidates.append(env_url)
+    The cache file is shared by every project on the machine, so it only
+    ever holds auto-discovered URLs and is skipped when a server is given.
+    Outside Docker host.docker.internal usually fails to resolve only after
+    the full timeout, so it is left out there.
     
-    # 3. Default localhost
-    candidates.append('http://localhost:4000')
+    Args:
+        base_url (str, optional): Base URL to try before the defaults
+        use_env (bool): Include OBSERVABILITY_SERVER_URL from the environment
+            and .env; the send_event daemon turns this off, since its own
+            environment need not match that of the hooks it serves
+        
+    Returns:
+        list: Unique candidate base URLs in priority order
+    """
+    env_url = get_configured_server_url() if use_env else None
+    cached_url = None if base_url or env_url else read_cached_server_url()
     
-    # 4. Docker fallback
-    candidates.append('http://host.docker.internal:4000')
+    candidates = [
+        base_url,
+        env_url,
+        cached_url,
+        'http://localhost:4000',
+    ]
+    if running_in_docker():
+        candidates.append('http://host.docker.internal:4000')
     
-    # Remove duplicates while preserving order
+    # Remove empty entries and duplicates while preserving order
     seen = set()
     unique_candidates = []
     for url in candidates:
-        if url not in seen:
+        if url and url not in seen:
             seen.add(url)
             unique_candidates.append(url)
     
-    # Test each candidate
-    for url in unique_candidates:
-        if test_server_connectivity(url):
+    return unique_candidates
+
+
+def discover_server_url(base_url=None, use_env=True):
+    """
+    Discover the correct observability server URL.
+    
+    Returns the cached URL when it is younger than CACHE_TTL, otherwise
+    probes every candidate from get_candidate_urls() concurrently and picks
+    the first reachable one in priority order, so a cold lookup costs at
+    most PROBE_TIMEOUT plus PROBE_MARGIN rather than one timeout per
+    candidate. Probes still running at that point count as unreachable.
+    
+    The cache is shared by every project, so it is only read and written
+    when neither base_url nor OBSERVABILITY_SERVER_URL names a server.
+    
+    Args:
+        base_url (str, optional): Base URL to try first
+        use_env (bool): Consider OBSERVABILITY_SERVER_URL, as in
+            get_candidate_urls()
+        
+    Returns:
+        str: Working server URL, or None if none work
+    """
+    configured_url = get_configured_server_url() if use_env else None
+    auto_discovery = not (base_url or configured_url)
+    if auto_discovery:
+        cached_url = read_cached_server_url()
+        if cached_url:
+            return cached_url
+    
+    candidates = get_candidate_urls(base_url, use_env)
+    results = [None] * len(candidates)
+    finished = [threading.Event() for _ in candidates]
+    
+    def probe(index, url):
+        try:
+            results[index] = test_server_connectivity(url)
+        finally:
+            finished[index].set()
+    
+    # Daemon threads, so probes still waiting on their timeout never hold
+    # up interpreter exit once a winner is known
+    for index, url in enumerate(candidates):
+        threading.Thread(target=probe, args=(index, url), daemon=True).start()
+    
+    deadline = time.monotonic() + PROBE_TIMEOUT + PROBE_MARGIN
+    for index, url in enumerate(candidates):
+        finished[index].wait(max(0, deadline - time.monotonic()))
+        if results[index]:
+            if auto_discovery:
+                write_cached_server_url(url)
             return url
     
     return None
 
 
-def test_server_connectivity(base_url, timeout=3):
+def test_server_connectivity(base_url, timeout=None, deep=False):
     """
     Test if the observability server is reachable.
     
+    By default this only opens a TCP connection to the server's port, trying
+    each of the host's addresses in turn; with deep=True it issues a full
+    HTTP GET against the root endpoint.
+    
     Args:
         base_url (str): Base URL like 'http://localhost:4000'
-        timeout (int): Connection timeout in seconds
+        timeout (float, optional): Connection timeout in seconds, defaults to
+            PROBE_TIMEOUT for the TCP check and 3 for the HTTP check
+        deep (bool): Check the HTTP root endpoint instead of the TCP port
         
     Returns:
         bool: True if server is reachable
     """
-    try:
-        # Test the root endpoint
-        req = urllib.request.Request(
-            base_url,
-            headers={'User-Agent': 'Claude-Code-Hook/1.0'}
-        )
-        
-        with urllib.request.urlopen(req, timeout=timeout) as response:
-            return response.status == 200
+    parts = urllib.parse.urlsplit(base_url)
+    
+    if deep:
+        try:
+            # Test the root endpoint, connecting to the cached IP of its host
+            url, headers = resolve_url(base_url)
+            headers['User-Agent'] = 'Claude-Code-Hook/1.0'
+            req = urllib.request.Request(url, headers=headers)
             
-    except (urllib.error.URLError, urllib.error.HTTPError, OSError):
+            with urllib.request.urlopen(req, timeout=timeout or 3) as response:
+                return response.status == 200
+                
+        except urllib.error.HTTPError:
+            return False
+        except (urllib.error.URLError, OSError):
+            invalidate_host(parts.hostname)
+            return False
+        except Exception:
+            return False
+    
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+    except ValueError:
         return False
-    except Exception:
+    addresses = resolve_addresses(parts.hostname, port) if parts.hostname else []
+    if not addresses:
         return False
+    
+    for ip in addresses:
+        sock = socket.socket(socket.AF_INET6 if ':' in ip else socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(timeout or PROBE_TIMEOUT)
+            if sock.connect_ex((ip, port)) == 0:
+                return True
+        except OSError:
+            pass
+        finally:
+            sock.close()
+    
+    invalidate_host(parts.hostname)
+    return False
 
 
 def get_events_endpoint(base_url=None):
@@ -133,9 +308,13 @@ def main():
     """Command line interface for testing server discovery."""
     import sys
     
-    if len(sys.argv) > 1:
-        test_url = sys.argv[1]
-        if test_server_connectivity(test_url):
+    if len(sys.argv) > 1 and sys.argv[1] == '--probe':
+        if len(sys.argv) < 3:
+            print("Usage: server_discovery.py [--probe URL [--deep]]")
+            sys.exit(1)
+        test_url = sys.argv[2]
+        deep = '--deep' in sys.argv[3:]
+        if test_server_connectivity(test_url, deep=deep):
             print(f"Server reachable: {test_url}")
         else:
             print(f"Server unreachable: {test_url}")
@@ -149,7 +328,8 @@ def main():
             print("Tried:")
             print("  - OBSERVABILITY_SERVER_URL environment variable")
             print("  - http://localhost:4000")
-            print("  - http://host.docker.internal:4000")
+            if running_in_docker():
+                print("  - http://host.docker.internal:4000")
 
 
 if __name__ == "__main__":
@@ -9,8 +9,96 @@
 
 import os
 import sys
+import shutil
 from pathlib import Path
-from dotenv import load_dotenv
+
+# Spoken notifications don't need music quality; a 32 kbit/s stream is about
+# a quarter of the bytes of mp3_44100_128 and arrives correspondingly sooner
+DEFAULT_OUTPUT_FORMAT = 'mp3_22050_32'
+
+# External player used only if MCI playback fails, looked up once
+_PLAYER = shutil.which('vlc')
+
+
+def find_streaming_player():
+    """
+    Find a player that can play mp3 audio piped to its stdin.
+    
+    Returns:
+        list: Player command line reading from stdin, or None if neither
+        ffplay nor mpv is installed
+    """
+    if shutil.which('ffplay'):
+        return ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'quiet', '-']
+    if shutil.which('mpv'):
+        return ['mpv', '--no-video', '--really-quiet', '-']
+    return None
+
+
+_STREAM_PLAYER = find_streaming_player()
+
+
+def stream_audio(audio, player_cmd):
+    """
+    Pipe audio chunks into a player as they arrive and wait for playback to end.
+    
+    Args:
+        audio: Iterable of mp3 byte chunks
+        player_cmd (list): Player command line reading from stdin
+    """
+    import subprocess
+    proc = subprocess.Popen(player_cmd, stdin=subprocess.PIPE,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for chunk in audio:
+            proc.stdin.write(chunk)
+    except BrokenPipeError:
+        pass  # Player exited early
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        proc.wait()
+
+
+def play_audio_windows(audio_file):
+    """
+    Play an audio file to completion on Windows.
+    
+    Plays in-process through the MCI API in winmm.dll, so no player
+    subprocess is spawned. Falls back to VLC if installed, then to the
+    default file association.
+    
+    Returns:
+        bool: True if playback was started by some method
+    """
+    try:
+        import ctypes
+        mci_send = ctypes.windll.winmm.mciSendStringW
+        if mci_send(f'open "{audio_file}" type mpegvideo alias tts_audio', None, 0, None) == 0:
+            try:
+                if mci_send('play tts_audio wait', None, 0, None) == 0:
+                    return True
+            finally:
+                mci_send('close tts_audio', None, 0, None)
+    except (ImportError, AttributeError, OSError):
+        pass
+    
+    if _PLAYER:
+        import subprocess
+        try:
+            subprocess.run([_PLAYER, '--play-and-exit', '--intf', 'dummy', audio_file],
+                           timeout=30, capture_output=True, check=False)
+            return True
+        except (subprocess.SubprocessError, OSError):
+            pass
+    
+    try:
+        os.startfile(audio_file)
+        return True
+    except (AttributeError, OSError):
+        return False
 
 def main():
     """
@@ -23,6 +111,8 @@ def main():
     - ./eleven_turbo_tts.py                    # Uses default text
     - ./eleven_turbo_tts.py "Your custom text" # Uses provided text
     
+    Set ELEVENLABS_OUTPUT_FORMAT (default mp3_22050_32) for higher quality audio.
+    
     Features:
     - Fast generation (optimized for real-time use)
     - High-quality voice synthesis
@@ -31,6 +121,7 @@ def main():
     """
     
     # Load environment variables
+    from dotenv import load_dotenv
     load_dotenv()
     
     # Get API key from environment
@@ -67,52 +158,22 @@ def main():
                 text=text,
                 voice_id="pNInz6obpgDQGcFmaJgB",  # Adam (free tier compatible)
                 model_id="eleven_turbo_v2_5",
-                output_format="mp3_44100_128",
+                output_format=os.getenv('ELEVENLABS_OUTPUT_FORMAT', DEFAULT_OUTPUT_FORMAT),
             )
             
-            # Save to temporary file and play
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as f:
-                audio_file = f.name
-                for chunk in audio:
-                    f.write(chunk)
-            
-            # Play the audio file on Windows using multiple methods
-            if platform.system() == "Windows":
-                import subprocess
-                played = False
-                
-                # Method 1: Try Windows Media Player
-                try:
-                    subprocess.run(['wmplayer', audio_file], 
-                                 timeout=1, capture_output=True, check=False)
-                    played = True
-                except:
-                    pass
-                
-                # Method 2: Try PowerShell with SoundPlayer (for WAV, but let's try)
-                if not played:
-                    try:
-                        ps_cmd = f'Add-Type -AssemblyName presentationCore; $player = New-Object System.Windows.Media.MediaPlayer; $player.Open([uri]"{audio_file}"); $player.Play(); Start-Sleep -Seconds 3'
-                        subprocess.run(['powershell', '-c', ps_cmd], 
-                                     timeout=5, capture_output=True, check=False)
-                        played = True
-                    except:
-                        pass
-                
-                # Method 3: Try VLC if available
-                if not played:
-                    try:
-                        subprocess.run(['vlc', '--play-and-exit', '--intf', 'dummy', audio_file], 
-                                     timeout=5, capture_output=True, check=False)
-                        played = True
-                    except:
-                        pass
+            if _STREAM_PLAYER:
+                # Start playback while the rest of the audio is still arriving
+                stream_audio(audio, _STREAM_PLAYER)
+            else:
+                # Save to temporary file and play
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as f:
+                    audio_file = f.name
+                    for chunk in audio:
+                        f.write(chunk)
                 
-                # Method 4: Fallback to start command
-                if not played:
-                    try:
-                        os.startfile(audio_file)
-                    except Exception as alt_error:
+                # Play the audio file on Windows
+                if platform.system() == "Windows":
+                    if not play_audio_windows(audio_file):
                         print(f"All playback methods failed. Audio file saved to: {audio_file}")
                         print("You can manually play this file to test audio.")
             